@@ -2,9 +2,12 @@
 FastAPI backend for Financial Heatmap Dashboard.
 Provides endpoints for index listing and heatmap data generation.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+import asyncio
+import orjson
 import sys
 
 # Add backend directory to path
@@ -38,18 +41,29 @@ csv_loader = CSVLoader(str(CSV_PATH))
 # Global cached service instance
 cached_service = None
 
+# Set of valid index names, populated at startup for O(1) validation
+index_name_set = set()
+
+# Prebuilt /indices response; the list only changes when the CSV reloads
+cached_indices_response = None
+
 
 @app.on_event("startup")
 async def startup_event():
     """
     Load CSV data on startup to validate file existence and cache it.
     """
-    global cached_service
+    global cached_service, cached_indices_response
     try:
         data = csv_loader.load_data()
         print(f"✓ CSV data loaded successfully ({len(data)} rows)")
         # Pre-initialize service with cached data
         cached_service = HeatmapService(data)
+        index_name_set.clear()
+        index_name_set.update(csv_loader.get_index_columns())
+        cached_indices_response = IndicesResponse(indices=csv_loader.get_index_columns())
+        # Drop any responses cached against previously loaded data
+        _response_cache.clear()
         print("✓ Heatmap service initialized")
     except FileNotFoundError as e:
         print(f"✗ Error: {e}")
@@ -79,66 +93,109 @@ async def root():
 async def get_indices():
     """
     Get list of all available index columns.
-    
+    Served from the response prebuilt at startup.
+
     Returns:
         IndicesResponse: List of index names
     """
     try:
-        indices = csv_loader.get_index_columns()
-        return IndicesResponse(indices=indices)
+        if cached_indices_response is not None:
+            return cached_indices_response
+        return IndicesResponse(indices=csv_loader.get_index_columns())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching indices: {str(e)}")
 
 
+# Serialized response bytes keyed on (index_name, forward_period); a plain
+# dict because the builder is a coroutine, which lru_cache cannot memoize
+_response_cache = {}
+
+
+async def _build_heatmap_response(index_name: str, forward_period: str = None) -> bytes:
+    """
+    Build the heatmap response for (index_name, forward_period) as
+    ready-to-send JSON bytes. The six independent metrics run concurrently
+    on the threadpool, the result is validated through HeatmapResponse once
+    and serialized with orjson, and the bytes are memoized: the underlying
+    data only changes when the CSV is reloaded, so repeat requests skip
+    both recomputation and per-field re-serialization (cache invalidated
+    in startup_event).
+    """
+    cache_key = (index_name, forward_period)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    service = cached_service
+
+    tasks = [
+        run_in_threadpool(service.generate_heatmap_matrix, index_name),
+        run_in_threadpool(service.generate_monthly_price_matrix, index_name),
+        run_in_threadpool(service.calculate_avg_monthly_profits_3y, index_name),
+        run_in_threadpool(service.calculate_rank_percentile_4y, index_name),
+        run_in_threadpool(service.calculate_monthly_rank_position, index_name),
+    ]
+    # Only forward-return requests need a separate heatmap matrix; plain
+    # requests reuse the MoM matrix computed for monthly_profits
+    if forward_period:
+        tasks.append(run_in_threadpool(service.calculate_forward_returns, index_name, forward_period))
+
+    results = await asyncio.gather(*tasks)
+    (
+        monthly_profits,  # Always MoM returns for this metric
+        monthly_price,
+        avg_monthly_profits_3y,
+        rank_percentile_4y,
+        monthly_rank_percentile,
+    ) = results[:5]
+    heatmap_data = results[5] if forward_period else monthly_profits
+
+    # Derived from rank_percentile_4y; not worth a threadpool hop of its own
+    inverse_rank_percentile = (
+        round(100 - rank_percentile_4y, 2) if rank_percentile_4y is not None else None
+    )
+
+    response = HeatmapResponse(
+        index=index_name,
+        heatmap=heatmap_data,
+        monthly_price=monthly_price,
+        monthly_profits=monthly_profits,
+        avg_monthly_profits_3y=avg_monthly_profits_3y,
+        rank_percentile_4y=rank_percentile_4y,
+        inverse_rank_percentile=inverse_rank_percentile,
+        monthly_rank_percentile=monthly_rank_percentile
+    )
+
+    body = orjson.dumps(response.model_dump())
+    _response_cache[cache_key] = body
+    return body
+
+
 @app.get("/heatmap/{index_name}", response_model=HeatmapResponse)
 async def get_heatmap(index_name: str, forward_period: str = None):
     """
     Get heatmap data for a specific index.
     Calculates monthly averages and month-over-month returns or forward returns.
-    
+
     Args:
         index_name: Name of the index (must match column name in CSV)
         forward_period: Optional forward period ('1M', '3M', '6M', '1Y', '2Y', '3Y', '4Y')
                        If provided, shows forward returns instead of MoM returns
-        
+
     Returns:
         HeatmapResponse: Heatmap matrix with year -> month -> return value
     """
     try:
         # Validate index exists
-        if index_name not in csv_loader.get_index_columns():
+        if index_name not in index_name_set:
             raise HTTPException(
                 status_code=404,
                 detail=f"Index '{index_name}' not found. Use /indices to see available indices."
             )
-        
-        # Use cached service instead of creating new one
-        service = cached_service
-        
-        # If forward_period is specified, use forward returns; otherwise use MoM returns
-        if forward_period:
-            heatmap_data = service.calculate_forward_returns(index_name, forward_period)
-        else:
-            heatmap_data = service.generate_heatmap_matrix(index_name)
-        
-        monthly_price = service.generate_monthly_price_matrix(index_name)
-        monthly_profits = service.generate_heatmap_matrix(index_name)  # Always MoM returns for this metric
-        avg_monthly_profits_3y = service.calculate_avg_monthly_profits_3y(index_name)
-        rank_percentile_4y = service.calculate_rank_percentile_4y(index_name)
-        inverse_rank_percentile = service.calculate_inverse_rank_percentile(index_name)
-        monthly_rank_percentile = service.calculate_monthly_rank_position(index_name)
-        
-        return HeatmapResponse(
-            index=index_name,
-            heatmap=heatmap_data,
-            monthly_price=monthly_price,
-            monthly_profits=monthly_profits,
-            avg_monthly_profits_3y=avg_monthly_profits_3y,
-            rank_percentile_4y=rank_percentile_4y,
-            inverse_rank_percentile=inverse_rank_percentile,
-            monthly_rank_percentile=monthly_rank_percentile
-        )
-        
+
+        body = await _build_heatmap_response(index_name, forward_period)
+        return Response(content=body, media_type="application/json")
+
     except HTTPException:
         raise
     except Exception as e:
@@ -3,8 +3,8 @@ Service layer for heatmap calculations and data processing.
 """
 import pandas as pd
 import numpy as np
+from collections import defaultdict
 from typing import Dict, Optional
-from functools import lru_cache
 
 
 class HeatmapService:
@@ -18,63 +18,177 @@ class HeatmapService:
     def __init__(self, data: pd.DataFrame):
         """
         Initialize the service with loaded data.
-        
+
         Args:
             data: DataFrame containing DATE and index columns
         """
         self.data = data
         # Cache for computed results
         self._cache = {}
-    
-    def _get_cache_key(self, index_name: str, operation: str, *args) -> str:
-        """Generate cache key for memoization."""
-        return f"{index_name}:{operation}:{':'.join(map(str, args))}"
-    
-    def calculate_monthly_average(self, index_name: str) -> pd.Series:
+        # Precompute monthly averages and MoM returns for ALL indices in one
+        # vectorized pass, so per-request calls are plain column lookups
+        self._precompute_monthly_matrices()
+
+    def _precompute_monthly_matrices(self):
         """
-        Calculate monthly average prices for a given index.
-        
+        Aggregate the raw daily arrays to monthly averages once, then derive
+        the MoM return matrix from it. The results are kept as plain column-major
+        NumPy matrices (months x indices) plus flat year/month arrays —
+        structure-of-arrays instead of DataFrames — shared by every
+        calculation method via self._col_pos column lookups.
+        """
+        # Raw arrays, already sorted by date by the loader
+        self._index_names = [col for col in self.data.columns if col != 'DATE']
+        self._col_pos = {col: i for i, col in enumerate(self._index_names)}
+        values = self.data[self._index_names].to_numpy()
+
+        # Month bucket id (year*12 + month-1) per row; group boundaries are
+        # where it changes. Aggregating with reduceat over the raw arrays
+        # avoids a pandas resample pass over the full frame at startup.
+        dates = self.data['DATE'].dt
+        bucket = dates.year.to_numpy() * 12 + (dates.month.to_numpy() - 1)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
+        # Grouped nan-mean: sum and count the valid cells per month in one
+        # reduceat each, then divide (months with no data become NaN)
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            monthly = np.where(counts > 0, sums / counts, np.nan)
+
+        # One shared period id per monthly row — int16 covers year*12+month
+        # for any plausible year — with (year, month) derived from it once
+        self._periods = bucket[starts].astype(np.int16)
+        self._years = (self._periods // 12).astype(np.int16)
+        self._months = (self._periods % 12 + 1).astype(np.int8)
+
+        # Dict keys for the year -> month -> value matrices, stringified once
+        self._year_keys = [str(year) for year in self._years]
+        self._month_keys = [str(month) for month in self._months]
+
+        # MoM returns: (avg_current_month / avg_previous_month) - 1
+        mom = np.full(monthly.shape, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mom[1:] = (monthly[1:] / monthly[:-1]) - 1
+
+        # Monthly prices stay float64: they get rounded to 2 decimals for the
+        # API and float32 cannot hold 6-figure index levels to cent precision.
+        # Returns are small magnitudes, so float32 halves their footprint.
+        # Fortran order makes the per-request column slices stride-1.
+        self._monthly_np = np.asfortranarray(monthly)
+        self._mom_np = np.asfortranarray(mom, dtype=np.float32)
+
+        # Rank every index in every month with a single sort pass over the
+        # full MoM matrix (1 = best performer). Competition ("min") ranks:
+        # tied returns — the CSV carries duplicated index columns — must
+        # share the rank of their first occurrence, so sort each row
+        # descending, keep the 1-based position only where the value changes,
+        # forward-fill it across each tie run, and invert the permutation.
+        # Ranks come from the float64 matrix so float32 rounding cannot
+        # create or break ties. NaN cells sort last and are masked after.
+        order = (-mom).argsort(axis=1, kind='stable')
+        sorted_mom = np.take_along_axis(mom, order, axis=1)
+        positions = np.arange(1, mom.shape[1] + 1)
+        new_value = np.ones(mom.shape, dtype=bool)
+        new_value[:, 1:] = sorted_mom[:, 1:] != sorted_mom[:, :-1]
+        min_ranks_sorted = np.maximum.accumulate(np.where(new_value, positions, 0), axis=1)
+        min_ranks = np.empty(mom.shape, dtype=np.int64)
+        np.put_along_axis(min_ranks, order, min_ranks_sorted, axis=1)
+        self._ranks = np.asfortranarray(
+            np.where(np.isnan(mom), np.nan, min_ranks), dtype=np.float32
+        )
+
+        # 4-year cumulative return of every index, computed in one pass over
+        # the raw value array extracted above (no second frame -> array copy)
+        self._returns_4y = self._compute_4y_returns(values, dates.year.to_numpy())
+
+    def _compute_4y_returns(self, values: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """
+        Compute the cumulative return over the last 4 years for every index
+        at once: view the raw array's 4-year tail, locate each column's
+        first and last non-NaN value with argmax over the NaN mask, and
+        divide. Columns with fewer than 2 values get NaN.
+
+        Args:
+            values: Raw (days x indices) value array, sorted by date
+            years: Calendar year of each row, same order
+
+        Returns:
+            1-D array of cumulative returns, ordered like the matrix columns
+        """
+        four_years_ago = years[-1] - 4
+        # Rows are date-sorted, so the window is a contiguous tail: slice a
+        # view instead of copying through a boolean mask
+        window = values[np.searchsorted(years, four_years_ago, side='right'):]
+
+        valid = ~np.isnan(window)
+        has_enough = valid.sum(axis=0) >= 2
+
+        col_range = np.arange(window.shape[1])
+        first_vals = window[valid.argmax(axis=0), col_range]
+        last_vals = window[len(window) - 1 - valid[::-1].argmax(axis=0), col_range]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.where(has_enough, (last_vals / first_vals) - 1, np.nan)
+
+        return returns
+
+    def _build_year_month_matrix(self, values: np.ndarray, decimals: int) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Shape a monthly value column into the year -> month -> value dict
+        used by the API. Rounding and NaN -> None substitution are done in
+        bulk on the whole array, not per cell.
+
+        Args:
+            values: 1-D array aligned with the precomputed monthly rows
+            decimals: Number of decimal places to round to
+
+        Returns:
+            Dictionary with year -> month -> value structure
+        """
+        # Upcast before rounding so float32 columns serialize as clean
+        # Python floats (0.0123, not 0.0123000000521...)
+        rounded = np.round(values.astype(np.float64), decimals)
+        cells = rounded.astype(object)
+        cells[np.isnan(rounded)] = None
+
+        matrix = defaultdict(dict)
+        for year_key, month_key, value in zip(self._year_keys, self._month_keys, cells):
+            matrix[year_key][month_key] = value
+
+        return dict(matrix)
+
+    def calculate_monthly_average(self, index_name: str) -> np.ndarray:
+        """
+        Get monthly average prices for a given index.
+
         Args:
             index_name: Name of the index column
-            
+
         Returns:
-            Series with monthly average values, indexed by (year, month)
+            Array of monthly average values, aligned with the year/month rows
         """
-        # Check cache
-        cache_key = self._get_cache_key(index_name, 'monthly_avg')
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        
-        # Create a copy with only DATE and the selected index
-        df = self.data[['DATE', index_name]].copy()
-        
-        # Extract year and month
-        df['Year'] = df['DATE'].dt.year
-        df['Month'] = df['DATE'].dt.month
-        
-        # Calculate monthly average
-        monthly_avg = df.groupby(['Year', 'Month'])[index_name].mean()
-        
-        # Cache result
-        self._cache[cache_key] = monthly_avg
-        
-        return monthly_avg
-    
-    def calculate_mom_returns(self, monthly_avg: pd.Series) -> pd.Series:
+        if index_name not in self._col_pos:
+            raise ValueError(f"Index '{index_name}' not found in data")
+
+        return self._monthly_np[:, self._col_pos[index_name]]
+
+    def calculate_mom_returns(self, index_name: str) -> np.ndarray:
         """
-        Calculate month-over-month return percentage.
+        Get month-over-month return percentage for a given index.
         Formula: (avg_current_month / avg_previous_month) - 1
-        
+
         Args:
-            monthly_avg: Series of monthly average values
-            
+            index_name: Name of the index column
+
         Returns:
-            Series of MoM returns
+            Array of MoM returns, aligned with the year/month rows
         """
-        # Calculate percentage change: (current / previous) - 1
-        mom_returns = (monthly_avg / monthly_avg.shift(1)) - 1
-        
-        return mom_returns
+        if index_name not in self._col_pos:
+            raise ValueError(f"Index '{index_name}' not found in data")
+
+        return self._mom_np[:, self._col_pos[index_name]]
     
     def generate_heatmap_matrix(self, index_name: str) -> Dict[str, Dict[str, Optional[float]]]:
         """
@@ -92,35 +206,17 @@ class HeatmapService:
             Dictionary with year -> month -> value structure
         """
         # Validate index exists
-        if index_name not in self.data.columns:
+        if index_name not in self._col_pos:
             raise ValueError(f"Index '{index_name}' not found in data")
-        
-        # Calculate monthly averages
-        monthly_avg = self.calculate_monthly_average(index_name)
-        
-        # Calculate MoM returns
-        mom_returns = self.calculate_mom_returns(monthly_avg)
-        
-        # Build the heatmap dictionary
-        heatmap: Dict[str, Dict[str, Optional[float]]] = {}
-        
-        for idx in mom_returns.index:
-            year = idx[0]
-            month = idx[1]
-            value = mom_returns.loc[idx]
-            year_str = str(year)
-            month_str = str(month)
-            
-            # Initialize year if not exists
-            if year_str not in heatmap:
-                heatmap[year_str] = {}
-            
-            # Add value (round to 4 decimal places, handle NaN)
-            if pd.isna(value):
-                heatmap[year_str][month_str] = None
-            else:
-                heatmap[year_str][month_str] = round(float(value), 4)
-        
+
+        cache_key = ('heatmap', index_name)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        # Build the heatmap dict from the precomputed MoM column in bulk
+        heatmap = self._build_year_month_matrix(self.calculate_mom_returns(index_name), 4)
+
+        self._cache[cache_key] = heatmap
         return heatmap
     
     def generate_monthly_price_matrix(self, index_name: str) -> Dict[str, Dict[str, Optional[float]]]:
@@ -133,27 +229,16 @@ class HeatmapService:
         Returns:
             Dictionary with year -> month -> price structure
         """
-        if index_name not in self.data.columns:
+        if index_name not in self._col_pos:
             raise ValueError(f"Index '{index_name}' not found in data")
-        
-        monthly_avg = self.calculate_monthly_average(index_name)
-        price_matrix: Dict[str, Dict[str, Optional[float]]] = {}
-        
-        for idx in monthly_avg.index:
-            year = idx[0]
-            month = idx[1]
-            value = monthly_avg.loc[idx]
-            year_str = str(year)
-            month_str = str(month)
-            
-            if year_str not in price_matrix:
-                price_matrix[year_str] = {}
-            
-            if pd.isna(value):
-                price_matrix[year_str][month_str] = None
-            else:
-                price_matrix[year_str][month_str] = round(float(value), 2)
-        
+
+        cache_key = ('monthly_price', index_name)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        price_matrix = self._build_year_month_matrix(self.calculate_monthly_average(index_name), 2)
+
+        self._cache[cache_key] = price_matrix
         return price_matrix
     
     def calculate_avg_monthly_profits_3y(self, index_name: str) -> Optional[float]:
@@ -166,31 +251,23 @@ class HeatmapService:
         Returns:
             Average monthly profit percentage over 3 years, or None if insufficient data
         """
-        if index_name not in self.data.columns:
-            raise ValueError(f"Index '{index_name}' not found in data")
-        
-        monthly_avg = self.calculate_monthly_average(index_name)
-        mom_returns = self.calculate_mom_returns(monthly_avg)
-        
-        # Get the most recent date
+        mom_returns = self.calculate_mom_returns(index_name)
+
         if len(mom_returns) == 0:
             return None
-        
-        latest_date = mom_returns.index[-1]
-        latest_year = latest_date[0]
-        
-        # Filter for last 3 years
-        three_years_ago = latest_year - 3
-        recent_returns = mom_returns[
-            [idx for idx in mom_returns.index if idx[0] > three_years_ago]
-        ]
-        
+
+        # Filter for last 3 calendar years (relative to the most recent
+        # month): everything from January of latest_year - 2 onwards,
+        # expressed as a single comparison on the shared period ids
+        start_period = (self._periods[-1] // 12 - 2) * 12
+        recent_returns = mom_returns[self._periods >= start_period]
+
+        # Calculate average, ignoring NaN values
+        recent_returns = recent_returns[~np.isnan(recent_returns)]
         if len(recent_returns) == 0:
             return None
-        
-        # Calculate average, ignoring NaN values
-        avg = recent_returns.mean()
-        return round(float(avg), 6) if not pd.isna(avg) else None
+
+        return round(float(recent_returns.mean()), 6)
     
     def calculate_rank_percentile_4y(self, index_name: str) -> Optional[float]:
         """
@@ -203,48 +280,19 @@ class HeatmapService:
         Returns:
             Rank percentile (0-100), or None if insufficient data
         """
-        if index_name not in self.data.columns:
+        if index_name not in self._col_pos:
             raise ValueError(f"Index '{index_name}' not found in data")
-        
-        # Get data for last 4 years
-        df = self.data[['DATE', index_name]].copy()
-        df['Year'] = df['DATE'].dt.year
-        
-        latest_year = df['Year'].max()
-        four_years_ago = latest_year - 4
-        df_4y = df[df['Year'] > four_years_ago]
-        
-        if len(df_4y) == 0:
-            return None
-        
-        # Calculate cumulative return over 4 years
-        values = df_4y[index_name].dropna()
-        if len(values) < 2:
+
+        cumulative_return = self._returns_4y[self._col_pos[index_name]]
+        if np.isnan(cumulative_return):
             return None
-        
-        cumulative_return = (values.iloc[-1] / values.iloc[0]) - 1
-        
-        # Calculate percentile rank among all indices for the same period
-        all_returns = []
-        for col in self.data.columns:
-            if col == 'DATE':
-                continue
-            try:
-                col_df = self.data[['DATE', col]].copy()
-                col_df['Year'] = col_df['DATE'].dt.year
-                col_df_4y = col_df[col_df['Year'] > four_years_ago]
-                col_values = col_df_4y[col].dropna()
-                if len(col_values) >= 2:
-                    col_return = (col_values.iloc[-1] / col_values.iloc[0]) - 1
-                    all_returns.append(col_return)
-            except:
-                continue
-        
+
+        all_returns = self._returns_4y[~np.isnan(self._returns_4y)]
         if len(all_returns) == 0:
             return None
-        
+
         # Calculate percentile (percentage of indices with lower return)
-        percentile = (sum(1 for r in all_returns if r < cumulative_return) / len(all_returns)) * 100
+        percentile = (all_returns < cumulative_return).mean() * 100
         return round(float(percentile), 2)
     
     def calculate_inverse_rank_percentile(self, index_name: str) -> Optional[float]:
@@ -275,62 +323,30 @@ class HeatmapService:
         Returns:
             Dictionary with year -> month -> rank position (1, 2, 3, etc.)
         """
-        if index_name not in self.data.columns:
+        if index_name not in self._col_pos:
             raise ValueError(f"Index '{index_name}' not found in data")
-        
-        # Calculate monthly averages and MoM returns for selected index
-        monthly_avg = self.calculate_monthly_average(index_name)
-        mom_returns = self.calculate_mom_returns(monthly_avg)
-        
-        # Calculate MoM returns for all indices
-        all_indices_returns = {}
-        for col in self.data.columns:
-            if col == 'DATE':
-                continue
-            try:
-                col_monthly_avg = self.calculate_monthly_average(col)
-                col_mom_returns = self.calculate_mom_returns(col_monthly_avg)
-                all_indices_returns[col] = col_mom_returns
-            except:
-                continue
-        
-        # Build the rank position dictionary
-        rank_matrix: Dict[str, Dict[str, Optional[int]]] = {}
-        
-        for idx in mom_returns.index:
-            year = idx[0]
-            month = idx[1]
-            value = mom_returns.loc[idx]
-            year_str = str(year)
-            month_str = str(month)
-            
-            # Initialize year if not exists
-            if year_str not in rank_matrix:
-                rank_matrix[year_str] = {}
-            
-            # Skip if no value for this month
-            if pd.isna(value):
-                rank_matrix[year_str][month_str] = None
-                continue
-            
-            # Collect all indices' returns for this same month (EXCLUDING the selected index)
-            same_month_returns = []
-            for col, col_returns in all_indices_returns.items():
-                if col == index_name:  # Skip the selected index itself
-                    continue
-                if idx in col_returns.index:
-                    col_value = col_returns.loc[idx]
-                    if not pd.isna(col_value):
-                        same_month_returns.append(col_value)
-            
-            # Calculate rank position (1 = best, higher = worse)
-            # Count how many OTHER indices have BETTER (higher) returns than this index
-            if len(same_month_returns) > 0:
-                rank_position = sum(1 for r in same_month_returns if r > value) + 1
-                rank_matrix[year_str][month_str] = int(rank_position)
-            else:
-                rank_matrix[year_str][month_str] = None
-        
+
+        cache_key = ('rank_position', index_name)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        # Slice the precomputed rank matrix for this index; ranking among all
+        # N indices already places the selected index at its 1-based position
+        col_ranks = self._ranks[:, self._col_pos[index_name]]
+
+        # Convert to int/None cells in bulk, then assemble in one pass over
+        # the precomputed keys
+        valid = ~np.isnan(col_ranks)
+        cells = np.empty(len(col_ranks), dtype=object)
+        cells[valid] = col_ranks[valid].astype(np.int64)
+        cells[~valid] = None
+
+        rank_matrix = defaultdict(dict)
+        for year_key, month_key, rank in zip(self._year_keys, self._month_keys, cells):
+            rank_matrix[year_key][month_key] = rank
+
+        rank_matrix = dict(rank_matrix)
+        self._cache[cache_key] = rank_matrix
         return rank_matrix
     
     def calculate_forward_returns(self, index_name: str, forward_period: str) -> Dict[str, Dict[str, Optional[float]]]:
@@ -345,9 +361,9 @@ class HeatmapService:
         Returns:
             Dictionary with year -> month -> forward return value
         """
-        if index_name not in self.data.columns:
+        if index_name not in self._col_pos:
             raise ValueError(f"Index '{index_name}' not found in data")
-        
+
         # Map forward period to number of months
         period_map = {
             '1M': 1,
@@ -363,39 +379,26 @@ class HeatmapService:
             raise ValueError(f"Invalid forward period: {forward_period}")
         
         months_forward = period_map[forward_period]
-        
-        # Calculate monthly averages
+
+        cache_key = ('forward', index_name, forward_period)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        # Precomputed monthly averages for this index
         monthly_avg = self.calculate_monthly_average(index_name)
-        
-        # Calculate forward returns
-        forward_returns: Dict[str, Dict[str, Optional[float]]] = {}
-        
-        # Convert monthly_avg to list for easier indexing
-        monthly_list = list(monthly_avg.items())
-        
-        for i, (idx, current_value) in enumerate(monthly_list):
-            year = idx[0]
-            month = idx[1]
-            year_str = str(year)
-            month_str = str(month)
-            
-            # Initialize year if not exists
-            if year_str not in forward_returns:
-                forward_returns[year_str] = {}
-            
-            # Check if we have data for the future period
-            future_idx = i + months_forward
-            if future_idx < len(monthly_list):
-                future_value = monthly_list[future_idx][1]
-                
-                # Calculate forward return: (future_value / current_value) - 1
-                if not pd.isna(current_value) and not pd.isna(future_value) and current_value != 0:
-                    forward_return = (future_value / current_value) - 1
-                    forward_returns[year_str][month_str] = round(float(forward_return), 4)
-                else:
-                    forward_returns[year_str][month_str] = None
-            else:
-                # No future data available
-                forward_returns[year_str][month_str] = None
-        
+
+        # Forward return: (value N months ahead / current value) - 1, done as
+        # one shifted division; the tail without future data stays NaN
+        forward = np.full(len(monthly_avg), np.nan)
+        if 0 < months_forward < len(monthly_avg):
+            current = monthly_avg[:-months_forward]
+            future = monthly_avg[months_forward:]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                forward[:-months_forward] = np.where(
+                    current == 0, np.nan, (future / current) - 1
+                )
+
+        forward_returns = self._build_year_month_matrix(forward, 4)
+
+        self._cache[cache_key] = forward_returns
         return forward_returns
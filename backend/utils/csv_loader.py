@@ -1,6 +1,7 @@
 """
 Utility functions for loading and processing CSV data.
 """
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Optional
@@ -20,42 +21,57 @@ class CSVLoader:
         """
         self.csv_path = csv_path
         self._data: Optional[pd.DataFrame] = None
+        self._index_columns: Optional[list] = None
     
+    # Format of the DATE column in the raw exports (day first, 2-digit year)
+    DATE_FORMAT = '%d/%m/%y'
+
     def load_data(self) -> pd.DataFrame:
         """
-        Load CSV data with proper date parsing.
-        Converts DATE column to datetime with dayfirst=True.
-        
+        Load CSV data with explicit dtypes and date parsing.
+        Declaring every index column float64 and the DATE format up front
+        lets the parser skip type inference and the slow per-element
+        dateutil fallback.
+
         Returns:
             DataFrame with processed data
         """
         if self._data is not None:
             return self._data
-        
+
         # Check if file exists
         if not Path(self.csv_path).exists():
             raise FileNotFoundError(f"CSV file not found: {self.csv_path}")
-        
-        # Load CSV and parse dates
-        df = pd.read_csv(self.csv_path)
-        
-        # Convert DATE column to datetime with dayfirst=True
-        df['DATE'] = pd.to_datetime(df['DATE'], dayfirst=True)
-        
+
+        # Read the header alone to build the dtype map for the value columns
+        columns = pd.read_csv(self.csv_path, nrows=0).columns
+        dtypes = {col: np.float64 for col in columns if col != 'DATE'}
+
+        # Load CSV, parsing dates in one vectorized pass
+        df = pd.read_csv(
+            self.csv_path,
+            dtype=dtypes,
+            parse_dates=['DATE'],
+            date_format=self.DATE_FORMAT,
+        )
+
         # Sort by date
         df = df.sort_values('DATE')
-        
+
         # Cache the data
         self._data = df
-        
+
         return df
     
     def get_index_columns(self) -> list:
         """
         Get list of all index columns (all columns except DATE).
-        
+        Computed once and cached alongside the data.
+
         Returns:
             List of index column names
         """
-        df = self.load_data()
-        return [col for col in df.columns if col != 'DATE']
+        if self._index_columns is None:
+            df = self.load_data()
+            self._index_columns = [col for col in df.columns if col != 'DATE']
+        return self._index_columns